@@ -1,42 +1,58 @@
 #!/usr/bin/env python3
-import curses, sys, os, subprocess, threading
+import curses, sys, os, re, subprocess, functools, bisect, concurrent.futures
+from collections import OrderedDict, deque
 from pygments import highlight as ph
 from pygments.lexers import guess_lexer_for_filename, TextLexer
 from pygments.formatters import TerminalFormatter
 from pygame import mixer
 from PIL import Image
 import numpy as np
-from wcwidth import wcwidth, wcswidth
 
 fmt = TerminalFormatter()
+_ANSI_RE = re.compile(r'\x1b\[[^m]*m')
+_LINENO_WIDTH = 5
+
+@functools.lru_cache(maxsize=64)
+def _get_lexer(fname):
+    try:
+        return guess_lexer_for_filename(fname, "")
+    except Exception:
+        return TextLexer()
 
 def syntax(line, fname, enabled=True):
     if not enabled:
         return line
-    try:
-        lex = guess_lexer_for_filename(fname or "<stdin>", line)
-    except Exception:
-        lex = TextLexer()
+    lex = _get_lexer(fname or "<stdin>")
     return ph(line, lex, fmt).rstrip('\n')
 
 def launch_new_window(fname):
     # Modify this command if you use another terminal emulator
-    cmd = f"xterm -e python3 {sys.argv[0]} --edit {fname}"
-    subprocess.Popen(cmd, shell=True)
+    # fname may be None when invoked with no argument; an empty string
+    # makes the child open an unnamed buffer
+    subprocess.Popen(["xterm", "-e", "python3", sys.argv[0], "--edit", fname or ""])
     sys.exit()
 
+_MIXER_READY = False
+
 def play_audio(path):
-    def _play():
+    # mixer.init() probes audio devices and is expensive; do it once.
+    # music.play() itself is non-blocking, so no thread is needed.
+    global _MIXER_READY
+    if not _MIXER_READY:
         mixer.init()
-        mixer.music.load(path)
-        mixer.music.play()
-    threading.Thread(target=_play, daemon=True).start()
+        _MIXER_READY = True
+    mixer.music.load(path)
+    mixer.music.play()
+
+_ASCII_TABLE = np.frombuffer(b"@%#*+=-:. ", dtype=np.uint8)
+_LUMA_LUT = [i * 9 // 255 for i in range(256)]
 
 def show_image(path):
-    img = Image.open(path).convert('L').resize((40,20))
-    arr = np.array(img)
-    chars = "@%#*+=-:. "
-    print("\n".join("".join(chars[p*9//255] for p in row) for row in arr))
+    img = Image.open(path).convert('L').resize((40,20), Image.Resampling.BILINEAR)
+    # Map luminance -> char index inside PIL, then view without copying
+    idx = np.asarray(img.point(_LUMA_LUT, 'L'))
+    ascii_bytes = _ASCII_TABLE[idx]
+    print("\n".join(row.tobytes().decode('ascii') for row in ascii_bytes))
     input("Press Enter to continue...")
 
 class Editor:
@@ -52,9 +68,24 @@ class Editor:
         self.search_term = ''
         self.syntax_enabled = True
         self.show_line_numbers = True
-        self.undo_stack = []
-        self.redo_stack = []
+        self.undo_stack = deque(maxlen=100)
+        self.redo_stack = deque(maxlen=100)
         self.status_msg = ''
+        self._hl_cache = OrderedDict()  # (fname, line) -> plain text
+        self._cur_pieces = None  # [left, right] halves of the line being edited
+        self._cur_y = 0
+        self._dirty = set()  # line indices needing repaint
+        self._full_redraw = True
+        self._last_size = None
+        self._last_status = None
+        self._last_prompt = None
+        self._joined = None  # buffer joined for C-level search
+        self._line_starts = None
+        # Single worker so back-to-back saves queue instead of writing
+        # the same file concurrently
+        self._io_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._save_future = None
+        self._lineno_cache = []  # "   1 ", "   2 ", ... grown on demand
         self.load_file()
         self.init_curses()
         self.formatter = TerminalFormatter()
@@ -69,119 +100,277 @@ class Editor:
         curses.init_pair(1, curses.COLOR_BLACK, curses.COLOR_WHITE)  # Status bar
         curses.init_pair(2, curses.COLOR_BLACK, curses.COLOR_CYAN)   # Command line
         curses.init_pair(3, curses.COLOR_WHITE, curses.COLOR_BLUE)   # Visual select
+        # Mark stdscr up to date so the first get_wch() doesn't flush a
+        # blank screen over the pad output
+        self.stdscr.refresh()
+        self._pad = None  # created on first draw, sized to the terminal
+        self._full_redraw = True
 
     def load_file(self):
         if self.fname and os.path.isfile(self.fname):
-            with open(self.fname, encoding='utf-8', errors='replace') as f:
-                self.lines = f.read().splitlines()
-            if not self.lines:
-                self.lines = ['']
+            # Read raw bytes and decode once; text mode would build an
+            # extra translated copy of the whole file
+            with open(self.fname, 'rb') as f:
+                text = f.read().decode('utf-8', 'replace')
+            if '\r' in text:
+                text = text.replace('\r\n', '\n').replace('\r', '\n')
+            self.lines = text.split('\n')
+            # split() leaves one empty trailing entry for files ending in \n
+            if len(self.lines) > 1 and self.lines[-1] == '':
+                self.lines.pop()
         else:
             self.lines = ['']
+        self._joined = None
+        # Positional undo ops from the old buffer cannot be replayed
+        # against a freshly loaded one
+        self.undo_stack.clear()
+        self.redo_stack.clear()
 
     def save_file(self, fname=None):
+        self._flush_cur_line()
         fname = fname or self.fname
-        if fname:
-            try:
-                with open(fname, 'w', encoding='utf-8') as f:
-                    f.write('\n'.join(self.lines))
+        if not fname:
+            self.status_msg = "No filename specified"
+            return
+        # Write on the I/O pool so keystrokes stay responsive; snapshot
+        # the lines since the buffer may mutate while the write runs
+        snapshot = list(self.lines)
+
+        def _write():
+            with open(fname, 'w', encoding='utf-8') as f:
+                # Stream line by line; '\n'.join would allocate a
+                # buffer-sized string first
+                last = len(snapshot) - 1
+                for i, ln in enumerate(snapshot):
+                    f.write(ln)
+                    if i != last:
+                        f.write('\n')
+
+        def _done(fut):
+            if fut.exception() is None:
                 self.status_msg = f"Saved to {fname}"
-                self.fname = fname
-            except Exception as e:
-                self.status_msg = f"Save failed: {e}"
+            else:
+                self.status_msg = f"Save failed: {fut.exception()}"
+
+        self.fname = fname
+        self.status_msg = f"Saving {fname}..."
+        self._save_future = self._io_pool.submit(_write)
+        self._save_future.add_done_callback(_done)
+
+    def _flush_cur_line(self):
+        # Write the piece buffer back before anything reads self.lines
+        if self._cur_pieces is not None:
+            self.lines[self._cur_y] = self._cur_pieces[0] + self._cur_pieces[1]
+            self._cur_pieces = None
+
+    def _materialize_cur_line(self):
+        # Split the current line around the cursor so inserts/backspaces
+        # only touch the left piece instead of rebuilding the whole line
+        if (self._cur_pieces is None or self._cur_y != self.cursor_y
+                or len(self._cur_pieces[0]) != self.cursor_x):
+            self._flush_cur_line()
+            line = self.lines[self.cursor_y]
+            self._cur_pieces = [line[:self.cursor_x], line[self.cursor_x:]]
+            self._cur_y = self.cursor_y
+
+    def push_undo(self, op):
+        # op is ('insert', y, x, text), ('delete', y, x, text),
+        # ('split', y, x), ('join', y, x) or ('snapshot', lines) for
+        # whole-buffer edits where a shallow copy is cheaper than a diff
+        self.undo_stack.append(op)
+        self.redo_stack.clear()
+        self._joined = None
+
+    def _revert(self, op):
+        # Un-apply op; return the op to push on the opposite stack
+        kind = op[0]
+        if kind in ('insert', 'delete'):
+            self._dirty.add(op[1])
         else:
-            self.status_msg = "No filename specified"
+            self._full_redraw = True
+        self._joined = None
+        if kind == 'insert':
+            _, y, x, text = op
+            line = self.lines[y]
+            self.lines[y] = line[:x] + line[x+len(text):]
+            self.cursor_y, self.cursor_x = y, x
+        elif kind == 'delete':
+            _, y, x, text = op
+            line = self.lines[y]
+            self.lines[y] = line[:x] + text + line[x:]
+            self.cursor_y, self.cursor_x = y, x + len(text)
+        elif kind == 'split':
+            _, y, x = op
+            self.lines[y] += self.lines.pop(y + 1)
+            self.cursor_y, self.cursor_x = y, x
+        elif kind == 'join':
+            _, y, x = op
+            self.lines.insert(y + 1, self.lines[y][x:])
+            self.lines[y] = self.lines[y][:x]
+            self.cursor_y, self.cursor_x = y + 1, 0
+        elif kind == 'snapshot':
+            current = list(self.lines)
+            self.lines = list(op[1])
+            return ('snapshot', current)
+        return op
 
-    def push_undo(self):
-        self.undo_stack.append([line[:] for line in self.lines])
-        if len(self.undo_stack) > 100:
-            self.undo_stack.pop(0)
+    def _reapply(self, op):
+        # Apply op forward; return the op to push on the opposite stack
+        kind = op[0]
+        if kind in ('insert', 'delete'):
+            self._dirty.add(op[1])
+        else:
+            self._full_redraw = True
+        self._joined = None
+        if kind == 'insert':
+            _, y, x, text = op
+            line = self.lines[y]
+            self.lines[y] = line[:x] + text + line[x:]
+            self.cursor_y, self.cursor_x = y, x + len(text)
+        elif kind == 'delete':
+            _, y, x, text = op
+            line = self.lines[y]
+            self.lines[y] = line[:x] + line[x+len(text):]
+            self.cursor_y, self.cursor_x = y, x
+        elif kind == 'split':
+            _, y, x = op
+            self.lines.insert(y + 1, self.lines[y][x:])
+            self.lines[y] = self.lines[y][:x]
+            self.cursor_y, self.cursor_x = y + 1, 0
+        elif kind == 'join':
+            _, y, x = op
+            self.lines[y] += self.lines.pop(y + 1)
+            self.cursor_y, self.cursor_x = y, x
+        elif kind == 'snapshot':
+            current = list(self.lines)
+            self.lines = list(op[1])
+            return ('snapshot', current)
+        return op
 
     def undo(self):
         if self.undo_stack:
-            self.redo_stack.append([line[:] for line in self.lines])
-            self.lines = self.undo_stack.pop()
+            self._flush_cur_line()
+            op = self.undo_stack.pop()
+            self.redo_stack.append(self._revert(op))
             self.cursor_y = min(self.cursor_y, len(self.lines)-1)
             self.cursor_x = min(self.cursor_x, len(self.lines[self.cursor_y]))
             self.status_msg = "Undo"
 
     def redo(self):
         if self.redo_stack:
-            self.undo_stack.append([line[:] for line in self.lines])
-            self.lines = self.redo_stack.pop()
+            self._flush_cur_line()
+            op = self.redo_stack.pop()
+            self.undo_stack.append(self._reapply(op))
             self.cursor_y = min(self.cursor_y, len(self.lines)-1)
             self.cursor_x = min(self.cursor_x, len(self.lines[self.cursor_y]))
             self.status_msg = "Redo"
 
     def draw(self):
-        self.stdscr.erase()
+        self._flush_cur_line()
         h, w = self.stdscr.getmaxyx()
+        if (h, w) != self._last_size:
+            self._last_size = (h, w)
+            self._full_redraw = True
+        if (self._pad is None
+                or self._pad.getmaxyx()[0] < h
+                or self._pad.getmaxyx()[1] < w):
+            # Off-screen buffer; painted here, flushed once per frame.
+            # Compare dimensions separately — a tuple compare misses a
+            # terminal that is wider but shorter than the pad
+            self._pad = curses.newpad(max(h, 200), max(w, 500))
+        pad = self._pad
         max_y = h - 3  # Leave room for status and command lines
 
-        for idx in range(min(len(self.lines), max_y)):
-            line = self.lines[idx]
-            lineno_str = f"{idx+1:4} " if self.show_line_numbers else ""
-            # Syntax highlight or raw line
-            line_str = syntax(line, self.fname, self.syntax_enabled)
+        visible = min(len(self.lines), max_y)
+        if self.show_line_numbers:
+            col0 = _LINENO_WIDTH
+            if len(self._lineno_cache) < visible:
+                self._lineno_cache.extend(
+                    f"{i:4} " for i in range(len(self._lineno_cache) + 1, visible + 1))
+        else:
+            col0 = 0
+        if self._full_redraw:
+            pad.erase()
+            rows = range(visible)
+        else:
+            # Repaint only lines an edit actually touched
+            rows = sorted(i for i in self._dirty if i < visible)
 
-            # Convert to plain text for curses rendering (strip ANSI)
-            try:
-                from pygments.formatters.terminal import TerminalFormatter
-                import re
-                ansi_escape = re.compile(r'\x1b\[.*?m')
-                line_str_plain = ansi_escape.sub('', line_str)
-            except Exception:
+        for idx in rows:
+            line = self.lines[idx]
+            if not self._full_redraw:
+                try:
+                    pad.move(idx, 0)
+                    pad.clrtoeol()
+                except curses.error:
+                    pass
+            lineno_str = self._lineno_cache[idx] if self.show_line_numbers else ""
+            if not self.syntax_enabled:
+                # No highlighting means nothing to strip either
                 line_str_plain = line
+            else:
+                # Highlight only on cache miss; unchanged lines reuse the
+                # already-stripped plain text from previous frames
+                hl_key = (self.fname, line)
+                line_str_plain = self._hl_cache.get(hl_key)
+                if line_str_plain is None:
+                    line_str = syntax(line, self.fname, self.syntax_enabled)
+                    # Convert to plain text for curses rendering (strip ANSI)
+                    line_str_plain = _ANSI_RE.sub('', line_str)
+                    self._hl_cache[hl_key] = line_str_plain
+                    if len(self._hl_cache) > 2048:
+                        self._hl_cache.popitem(last=False)
+                else:
+                    self._hl_cache.move_to_end(hl_key)
 
             # Handling visual mode selection
             if self.mode == 'VISUAL' and self.vis_start and idx == self.cursor_y:
+                # At most three addstr calls: before, selection, after
                 xs, xe = sorted((self.vis_start[1], self.cursor_x))
-                displayed_line = ''
-                pos = 0
-                for ch in line_str_plain:
-                    width = max(wcwidth(ch),1)
-                    attr = curses.A_REVERSE if xs <= pos < xe else 0
-                    try:
-                        self.stdscr.addstr(idx, len(lineno_str)+pos, ch, attr)
-                    except curses.error:
-                        pass
-                    pos += 1
+                shown = line_str_plain[:w - col0 - 1]
                 try:
-                    self.stdscr.addstr(idx, 0, lineno_str, curses.A_DIM)
+                    pad.addstr(idx, 0, lineno_str, curses.A_DIM)
+                    pad.addstr(idx, col0, shown[:xs])
+                    pad.addstr(idx, col0 + xs, shown[xs:xe], curses.A_REVERSE)
+                    pad.addstr(idx, col0 + xe, shown[xe:])
                 except curses.error:
                     pass
             else:
                 try:
-                    self.stdscr.addstr(idx, 0, lineno_str + line_str_plain[:w - len(lineno_str) - 1])
+                    pad.addstr(idx, 0, lineno_str + line_str_plain[:w - col0 - 1])
                 except curses.error:
                     pass
 
-        # Status bar
+        # Status bar (skip the addstrs when nothing on it changed)
         status = f"--{self.mode}-- {self.fname or '[No Name]'} Ln {self.cursor_y+1}, Col {self.cursor_x+1}  {self.status_msg}"
         self.status_msg = ''
-        try:
-            self.stdscr.addstr(h - 2, 0, " " * (w - 1), curses.color_pair(1))
-            self.stdscr.addstr(h - 2, 0, status[:w - 1], curses.color_pair(1))
-        except curses.error:
-            pass
+        if self._full_redraw or (status, w) != self._last_status:
+            self._last_status = (status, w)
+            try:
+                pad.addstr(h - 2, 0, " " * (w - 1), curses.color_pair(1))
+                pad.addstr(h - 2, 0, status[:w - 1], curses.color_pair(1))
+            except curses.error:
+                pass
 
         # Command line (only in CMD mode)
         if self.mode == 'CMD':
             prompt = ":" + self.cmd_buffer
-            try:
-                self.stdscr.addstr(h - 1, 0, " " * (w - 1), curses.color_pair(2))
-                self.stdscr.addstr(h - 1, 0, prompt[:w - 1], curses.color_pair(2))
-            except curses.error:
-                pass
-            self.stdscr.move(h - 1, len(prompt))
+            if self._full_redraw or (prompt, w) != self._last_prompt:
+                self._last_prompt = (prompt, w)
+                try:
+                    pad.addstr(h - 1, 0, " " * (w - 1), curses.color_pair(2))
+                    pad.addstr(h - 1, 0, prompt[:w - 1], curses.color_pair(2))
+                except curses.error:
+                    pass
+            pad.move(h - 1, len(prompt))
         else:
-            # Move cursor to position
-            cx = self.cursor_x
-            if self.show_line_numbers:
-                cx += 5  # account for line number width
-            self.stdscr.move(self.cursor_y, cx)
+            # Move cursor to position, past the line-number gutter
+            pad.move(self.cursor_y, self.cursor_x + col0)
 
-        self.stdscr.refresh()
+        self._dirty.clear()
+        self._full_redraw = False
+        pad.noutrefresh(0, 0, 0, 0, h - 1, w - 1)
+        curses.doupdate()
 
     def get_input(self):
         try:
@@ -190,6 +379,9 @@ class Editor:
             return None
 
     def command_dispatch(self, cmd):
+        self._flush_cur_line()
+        # Commands are rare and may change anything; repaint everything
+        self._full_redraw = True
         args = cmd.strip().split()
         if not args:
             return
@@ -206,6 +398,8 @@ class Editor:
                 sys.exit(0)
             elif c == 'wq':  # save and quit
                 self.save_file()
+                if self._save_future is not None:
+                    self._save_future.exception()  # block until the write lands
                 sys.exit(0)
             elif c == 'e':  # edit new file
                 if rest:
@@ -221,6 +415,7 @@ class Editor:
                     try:
                         with open(rest[0], encoding='utf-8') as f:
                             self.lines.extend(f.read().splitlines())
+                        self._joined = None
                         self.status_msg = f"Appended {rest[0]}"
                     except Exception as e:
                         self.status_msg = f"Error reading {rest[0]}: {e}"
@@ -233,7 +428,7 @@ class Editor:
                         self.show_line_numbers = not self.show_line_numbers
                         self.status_msg = f"Line numbers {'on' if self.show_line_numbers else 'off'}"
             elif c == '!':  # shell command
-                os.system(" ".join(rest))
+                subprocess.run(rest, check=False)
             elif c == 'open':  # open media file at cursor word
                 if rest:
                     path = rest[0]
@@ -258,8 +453,13 @@ class Editor:
                 if rest:
                     try:
                         old, new = rest[0].split('/', 1)
-                        self.push_undo()
-                        self.lines = [ln.replace(old, new) for ln in self.lines]
+                        # One C-level replace over the joined buffer
+                        # instead of a replace call per line (this also
+                        # lets old span a newline); grab any cached join
+                        # before push_undo invalidates it
+                        joined = self._joined if self._joined is not None else '\n'.join(self.lines)
+                        self.push_undo(('snapshot', list(self.lines)))
+                        self.lines = joined.replace(old, new).split('\n')
                         self.status_msg = f"Replaced '{old}' with '{new}'"
                     except Exception:
                         self.status_msg = "Usage: :replace old/new"
@@ -268,7 +468,7 @@ class Editor:
             elif c == 'redo':
                 self.redo()
             elif c == 'new':
-                self.push_undo()
+                self.push_undo(('snapshot', list(self.lines)))
                 self.lines = ['']
                 self.cursor_x = self.cursor_y = 0
                 self.fname = None
@@ -279,13 +479,24 @@ class Editor:
             self.status_msg = f"Command error: {e}"
 
     def find_term(self, term):
-        for i, l in enumerate(self.lines):
-            idx = l.find(term)
-            if idx != -1:
-                self.cursor_y = i
-                self.cursor_x = idx
-                self.status_msg = f"Found '{term}' at Ln {i+1}"
-                return True
+        self._flush_cur_line()
+        if self._joined is None:
+            # One C-level scan over the joined buffer beats a find() per
+            # line; repeat searches reuse the join until the buffer changes
+            self._joined = "\n".join(self.lines)
+            starts = [0]
+            acc = 0
+            for ln in self.lines:
+                acc += len(ln) + 1
+                starts.append(acc)
+            self._line_starts = starts
+        pos = self._joined.find(term)
+        if pos != -1:
+            i = bisect.bisect_right(self._line_starts, pos) - 1
+            self.cursor_y = i
+            self.cursor_x = pos - self._line_starts[i]
+            self.status_msg = f"Found '{term}' at Ln {i+1}"
+            return True
         self.status_msg = f"'{term}' not found"
         return False
 
@@ -320,20 +531,25 @@ class Editor:
                 self.cursor_y -= 1
                 self.cursor_x = min(self.cursor_x, len(self.lines[self.cursor_y]))
         elif key == 'p':
-            # Preview media file under cursor word
-            words = self.lines[self.cursor_y].split()
-            # Find which word cursor is on (approximate)
-            cum = 0
-            for w in words:
-                if cum <= self.cursor_x < cum + len(w):
-                    if w.endswith(('.wav', '.mp3')):
-                        play_audio(w)
-                    elif w.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
-                        curses.endwin()
-                        show_image(w)
-                        self.init_curses()
-                    break
-                cum += len(w) + 1
+            # Preview media file under cursor word; word bounds come from
+            # two C-level find calls instead of splitting the line
+            line = self.lines[self.cursor_y]
+            start = line.rfind(' ', 0, self.cursor_x) + 1
+            end = line.find(' ', self.cursor_x)
+            if end == -1:
+                end = len(line)
+            word = line[start:end]
+            if word.endswith(('.wav', '.mp3')):
+                try:
+                    play_audio(word)
+                except Exception as e:
+                    # No audio device, or the word isn't a real file;
+                    # the old per-play thread used to swallow these
+                    self.status_msg = f"Audio error: {e}"
+            elif word.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
+                curses.endwin()
+                show_image(word)
+                self.init_curses()
         elif key == '\x1b':  # ESC
             self.mode = 'NORMAL'
             self.vis_start = None
@@ -342,33 +558,43 @@ class Editor:
 
     def process_insert(self, key):
         if key == '\x1b':
+            # A coalesced batch can dispatch NORMAL/VISUAL keys before
+            # the next draw flushes, so flush on leaving INSERT
+            self._flush_cur_line()
             self.mode = 'NORMAL'
         elif key == '\n':
-            self.push_undo()
+            self._flush_cur_line()
+            self.push_undo(('split', self.cursor_y, self.cursor_x))
             line = self.lines[self.cursor_y]
             new_line = line[self.cursor_x:]
             self.lines[self.cursor_y] = line[:self.cursor_x]
             self.lines.insert(self.cursor_y + 1, new_line)
             self.cursor_y += 1
             self.cursor_x = 0
+            self._full_redraw = True  # lines below shifted
         elif key in (curses.KEY_BACKSPACE, '\x7f'):
             if self.cursor_x > 0:
-                self.push_undo()
-                line = self.lines[self.cursor_y]
-                self.lines[self.cursor_y] = line[:self.cursor_x-1] + line[self.cursor_x:]
+                self._materialize_cur_line()
+                ch = self._cur_pieces[0][-1]
+                self.push_undo(('delete', self.cursor_y, self.cursor_x-1, ch))
+                self._cur_pieces[0] = self._cur_pieces[0][:-1]
                 self.cursor_x -= 1
+                self._dirty.add(self.cursor_y)
             elif self.cursor_y > 0:
-                self.push_undo()
+                self._flush_cur_line()
                 prev_line_len = len(self.lines[self.cursor_y-1])
+                self.push_undo(('join', self.cursor_y-1, prev_line_len))
                 self.lines[self.cursor_y-1] += self.lines[self.cursor_y]
                 self.lines.pop(self.cursor_y)
                 self.cursor_y -= 1
                 self.cursor_x = prev_line_len
+                self._full_redraw = True  # lines below shifted
         elif isinstance(key, str):
-            self.push_undo()
-            line = self.lines[self.cursor_y]
-            self.lines[self.cursor_y] = line[:self.cursor_x] + key + line[self.cursor_x:]
+            self.push_undo(('insert', self.cursor_y, self.cursor_x, key))
+            self._materialize_cur_line()
+            self._cur_pieces[0] += key
             self.cursor_x += 1
+            self._dirty.add(self.cursor_y)
 
     def process_visual(self, key):
         if key == '\x1b':
@@ -417,14 +643,35 @@ class Editor:
             key = self.get_input()
             if key is None:
                 continue
-            if self.mode == 'NORMAL':
-                self.process_normal(key)
-            elif self.mode == 'INSERT':
-                self.process_insert(key)
-            elif self.mode == 'VISUAL':
-                self.process_visual(key)
-            elif self.mode == 'CMD':
-                self.process_cmd(key)
+            # Drain anything already queued (e.g. a paste) so a burst of
+            # keys costs one draw instead of one per key
+            keys = [key]
+            self.stdscr.nodelay(True)
+            try:
+                while len(keys) < 256:
+                    k = self.get_input()
+                    if k is None:
+                        break
+                    keys.append(k)
+            finally:
+                self.stdscr.nodelay(False)
+            for key in keys:
+                prev_mode, prev_y = self.mode, self.cursor_y
+                if self.mode == 'NORMAL':
+                    self.process_normal(key)
+                elif self.mode == 'INSERT':
+                    self.process_insert(key)
+                elif self.mode == 'VISUAL':
+                    self.process_visual(key)
+                elif self.mode == 'CMD':
+                    self.process_cmd(key)
+                if self.mode != prev_mode:
+                    # Mode switches add/remove highlights and the CMD prompt
+                    self._full_redraw = True
+                elif self.mode == 'VISUAL':
+                    # Selection tracks the cursor
+                    self._dirty.add(prev_y)
+                    self._dirty.add(self.cursor_y)
 
 def main(stdscr, fname=None):
     editor = Editor(stdscr, fname)